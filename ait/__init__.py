@@ -2,3 +2,14 @@ from . import _common
 # TODO don't use * and define __all__
 from .ait import *
 from .version import __version__
+
+
+def __getattr__(name):
+    # Only the Linux backend has a logger, and it's created the first time `log` is used.
+    if name == 'log':
+        from .ait import _mod
+        try:
+            return _mod.log
+        except AttributeError:
+            pass
+    raise AttributeError('module {!r} has no attribute {!r}'.format(__name__, name))
@@ -11,7 +11,10 @@ class MB(Enum):
 
     @classmethod
     def parse(cls, value):
-        if isinstance(value, (int, float)):
+        if isinstance(value, MB):
+            return value
+
+        elif isinstance(value, (int, float)):
             if value < 0:
                 return MB.L
             elif value > 0:
@@ -28,4 +31,4 @@ class MB(Enum):
             elif value in ('M', 'MMB'):
                 return MB.M
 
-        return ValueError('Invalid mouse button {!r}'.format(value))
+        raise ValueError('Invalid mouse button {!r}'.format(value))
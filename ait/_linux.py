@@ -1,12 +1,10 @@
 import functools
+import re
+import shutil
 import subprocess
+import threading
+from contextlib import contextmanager
 
-try:
-    import screeninfo
-except ImportError:
-    screeninfo = None
-
-from .logger import Logger
 from ._common import Position, MB
 
 BUTTONS = {
@@ -50,6 +48,7 @@ KEYS = {
     '}': 'braceright',
     '~': 'asciitilde',
     '\b': 'BackSpace',
+    '\t': 'Tab',
     '\n': 'Return'
 }
 
@@ -57,16 +56,9 @@ KEYS = {
 def _requires(*, program, message):
     """
     Decorator that replaces methods with a no-op raise error function
-    if the desired condition (such as a program running successfully)
-    is not met.
+    if the desired program is not installed.
     """
-    try:
-        subprocess.run(program, shell=True, check=True,
-                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-    except (FileNotFoundError, subprocess.CalledProcessError):
-        ok = False
-    else:
-        ok = True
+    ok = shutil.which(program) is not None
 
     def decorator(f):
         if ok:
@@ -80,21 +72,68 @@ def _requires(*, program, message):
     return decorator
 
 
-_requires_xdotool = _requires(program='xdotool -v',
+_requires_xdotool = _requires(program='xdotool',
                               message='xdotool is not installed')
 
+# With the full path (and `close_fds=False`), Python 3.8+ can start xdotool with `posix_spawn` instead of fork and exec.
+_XDOTOOL = shutil.which('xdotool') or 'xdotool'
+
+_MOUSE_RE = re.compile(rb'x:(\d+) y:(\d+)')
+
+# How long to wait for xdotool to answer a query before giving up on it.
+# Actions have no limit, since typing long text can take as long as it needs.
+XDOTOOL_QUERY_TIMEOUT = 5.0
+
+# `_local.batch` holds the commands queued by the thread's active `batch`, if any.
+_local = threading.local()
+
 
-def _parse_button(n):
+def _xdotool_run(args, stdout=subprocess.DEVNULL, timeout=None):
+    # xdotool runs all the commands given in a single invocation one after another ("command chaining"),
+    # so a whole batch only needs to start one process and connect to X once.
     try:
-        return BUTTONS[n]
-    except KeyError:
-        raise ValueError('Invalid button given') from None
+        # Python's own file descriptors aren't inheritable anyway, so there's nothing for `close_fds` to close.
+        return subprocess.run((_XDOTOOL,) + args, stdout=stdout, timeout=timeout, check=True,
+                              close_fds=False).stdout
+    except subprocess.TimeoutExpired:
+        raise RuntimeError('xdotool did not answer in {} seconds'.format(timeout)) from None
+    except subprocess.CalledProcessError as e:
+        raise RuntimeError('xdotool failed with exit status {}'.format(e.returncode)) from None
+
+
+def _xdotool(*args):
+    queue = getattr(_local, 'batch', None)
+    if queue is None:
+        _xdotool_run(args)
+    else:
+        queue.append(args)
+
+
+def _run_batch(queue):
+    # Only the last position matters when moving several times in a row (but paths are kept whole).
+    commands = [command for command, after in zip(queue, queue[1:] + [()])
+                if not (len(command) == 3 and command[0] == 'mousemove' and after[:1] == ('mousemove',))]
+    queue.clear()
+
+    args = []
+    for command in commands:
+        args += command
+        # `key` and `type` take any number of arguments, so whatever came after them could be read as one more.
+        if command[0] in ('key', 'type'):
+            _xdotool_run(tuple(args))
+            args = []
+
+    if args:
+        _xdotool_run(tuple(args))
 
 
 @functools.lru_cache(1)
 def _get_screen_size():
-    if screeninfo is None:
-        raise ValueError('screeninfo must be installed to use % positions')
+    # screeninfo is only needed (and imported) the first time a % position is used.
+    try:
+        import screeninfo
+    except ImportError:
+        raise ValueError('screeninfo must be installed to use % positions') from None
 
     monitor = screeninfo.get_monitors()[0]
     _screen_size = (monitor.width, monitor.height)
@@ -102,6 +141,15 @@ def _get_screen_size():
 
 
 def _parse_pos(x, y):
+    # Plain pixel coordinates are by far the most common, and don't need any scaling (or caching).
+    if type(x) is int and type(y) is int:
+        return str(x), str(y), False
+
+    return _parse_scaled_pos(x, y)
+
+
+@functools.lru_cache(256)
+def _parse_scaled_pos(x, y):
     rel = x.imag or y.imag
     if rel:
         x = x.imag or x.real
@@ -122,20 +170,32 @@ def _parse_pos(x, y):
 
 @_requires_xdotool
 def mouse():
-    output = subprocess.run(('xdotool', 'getmouselocation'),
-                            stdout=subprocess.PIPE).stdout
+    queue = getattr(_local, 'batch', None)
+    if queue:
+        _run_batch(queue)
 
-    end = output.index(b' ', 3)  # Start at 'x:_'
-    x = int(output[2:end])
-    y = int(output[end + 3:output.index(b' ', end + 4)])
-    return Position(x, y)
+    m = _MOUSE_RE.match(_xdotool_run(('getmouselocation',), stdout=subprocess.PIPE, timeout=XDOTOOL_QUERY_TIMEOUT))
+    return Position(int(m.group(1)), int(m.group(2)))
 
 
 @_requires_xdotool
 def move(x, y):
     x, y, rel = _parse_pos(x, y)
     move_arg = 'mousemove_relative' if rel else 'mousemove'
-    subprocess.run(('xdotool', move_arg, x, y))
+    _xdotool(move_arg, x, y)
+
+
+@_requires_xdotool
+def move_path(points):
+    args = []
+    for x, y in points:
+        x, y, rel = _parse_pos(x, y)
+        if rel:
+            raise ValueError('relative positions are not supported in a path')
+        args += ('mousemove', x, y)
+
+    if args:
+        _xdotool(*args)
 
 
 @_requires_xdotool
@@ -156,7 +216,7 @@ def click(*args):
     else:
         raise TypeError('0, 1, 2 or 3 arguments required, but {} given'.format(argc))
 
-    subprocess.run(('xdotool', 'click', BUTTONS[button]))
+    _xdotool('click', BUTTONS[button])
 
 
 # Keyboard
@@ -164,16 +224,30 @@ def click(*args):
 
 @_requires_xdotool
 def press(*keys):
-    args = ['xdotool', 'key']
-    args.extend(KEYS.get(k, k) for k in keys)
-    subprocess.run(args)
+    _xdotool('key', *(KEYS.get(k, k) for k in keys))
 
 
 @_requires_xdotool
 def write(*texts):
-    args = ['xdotool', 'type']
-    args.extend(texts)
-    subprocess.run(args)
+    _xdotool('type', *texts)
+
+
+@_requires_xdotool
+@contextmanager
+def batch():
+    if getattr(_local, 'batch', None) is not None:
+        # Nested batches are queued by the outermost one.
+        yield
+        return
+
+    _local.batch = queue = []
+    try:
+        yield
+    finally:
+        _local.batch = None
+
+    # Only reached if the block didn't raise, so a half-done batch is thrown away instead.
+    _run_batch(queue)
 
 
 # Mouse-keyboard common
@@ -185,7 +259,17 @@ def write(*texts):
 # Screen-related functions
 
 
-try:
-    log = Logger()
-except ValueError:
-    log = None
+def __getattr__(name):
+    # The logger connects to X (twice), so `log` is only created the first time it's used.
+    global log
+    if name != 'log':
+        raise AttributeError('module {!r} has no attribute {!r}'.format(__name__, name))
+
+    from .logger import Logger, Xlib
+    try:
+        log = Logger()
+    except ValueError:
+        log = None
+    except Xlib.error.DisplayError:
+        log = None
+    return log
@@ -2,12 +2,24 @@ import ctypes
 import sys
 import time
 import functools
-from ctypes.wintypes import HANDLE, BOOL, HWND, UINT, HGLOBAL, LPVOID
+import queue
+import struct
+import threading
+import weakref
+from ctypes.wintypes import HANDLE, BOOL, HWND, UINT, HGLOBAL, LPVOID, HDC, DWORD, WORD, LONG, WCHAR, \
+    WPARAM, LPARAM, MSG, HMODULE, LPCWSTR
 from contextlib import contextmanager
 import asyncio
 from ._common import Position, Color, MB
 
-EVENTS_POLL_DELAY = 0.05
+# How long to wait for events at a time, so that Ctrl+C can still interrupt the wait.
+EVENTS_WAIT_TIMEOUT = 0.1
+
+# How long to wait for the thread running the input hooks to start or stop.
+HOOKS_TIMEOUT = 5.0
+
+# How long the screen size is cached for before being queried again, so that resolution changes are noticed.
+SCREEN_SIZE_REFRESH = 1.0
 
 NO_ERROR = 0
 
@@ -19,22 +31,45 @@ VK_SHIFT = 0x10
 VK_CONTROL = 0x11
 VK_MENU = 0x12  # ALT
 
+KEYEVENTF_EXTENDEDKEY = 0x0001
 KEYEVENTF_KEYUP = 0x0002
 
-
+MAPVK_VK_TO_VSC_EX = 4
+
+WH_KEYBOARD_LL = 13
+WH_MOUSE_LL = 14
+HC_ACTION = 0
+PM_NOREMOVE = 0x0000
+
+WM_QUIT = 0x0012
+WM_KEYDOWN = 0x0100
+WM_KEYUP = 0x0101
+WM_SYSKEYDOWN = 0x0104
+WM_SYSKEYUP = 0x0105
+WM_LBUTTONDOWN = 0x0201
+WM_LBUTTONUP = 0x0202
+WM_RBUTTONDOWN = 0x0204
+WM_RBUTTONUP = 0x0205
+WM_MBUTTONDOWN = 0x0207
+WM_MBUTTONUP = 0x0208
+WM_XBUTTONDOWN = 0x020B
+WM_XBUTTONUP = 0x020C
+
+MOUSEEVENTF_MOVE = 0x0001
 MOUSEEVENTF_LEFTDOWN = 0x0002
 MOUSEEVENTF_LEFTUP = 0x0004
 MOUSEEVENTF_RIGHTDOWN = 0x0008
 MOUSEEVENTF_RIGHTUP = 0x0010
 MOUSEEVENTF_MIDDLEDOWN = 0x0020
 MOUSEEVENTF_MIDDLEUP = 0x0040
+MOUSEEVENTF_ABSOLUTE = 0x8000
 
 BI_RGB = DIB_RGB_COLORS = 0
 SRCCOPY = 0x00CC0020
-ERROR_INVALID_PARAMETER = 87
+HGDI_ERROR = ctypes.c_void_p(-1).value
 
 # https://docs.microsoft.com/en-us/windows/desktop/inputdev/virtual-key-codes
-KEYS = [
+KEYS = (
     (),
     ('LMB',),
     ('RMB',),
@@ -291,9 +326,20 @@ KEYS = [
     ('PA1',),
     ('OEMCLEAR',),
     (),
-]
+)
+
+
+class _KeyMap(dict):
+    def __missing__(self, key):
+        # Any other single character uses its own code as the virtual key, as long as it fits in one.
+        if len(key) != 1 or key > '\xff':
+            raise ValueError('Unknown key {!r}'.format(key))
+        # TODO VkKeyScanExA
+        vk = self[key] = ord(key)
+        return vk
 
-KEY_MAP = {name: vk for vk, names in enumerate(KEYS) for name in names}
+
+KEY_MAP = _KeyMap((name, vk) for vk, names in enumerate(KEYS) for name in names)
 
 BUTTON_TO_EVENTS = {
     MB.L: (MOUSEEVENTF_LEFTDOWN, MOUSEEVENTF_LEFTUP),
@@ -306,42 +352,85 @@ GMEM_MOVEABLE = 0x0002
 GMEM_ZEROINIT = 0x0040
 
 
-def _key_to_vk(key):
+# Named keys are normalized before they're looked up, so the result is cached for the key as given.
+@functools.lru_cache(512)
+def _lookup_vk(key):
     if key != ' ':
         key = key.strip(' ').upper()
-    try:
-        return KEY_MAP[key]
-    except KeyError:
-        try:
-            # TODO VkKeyScanExA
-            return ord(key)
-        except TypeError:
-            raise ValueError('Unknown key {!r}'.format(key)) from None
+    return KEY_MAP[key]
 
 
-def _vk_to_key(vk):
-    try:
-        return KEYS[vk][0]
-    except KeyError:
-        return ValueError('Unknown virtual key {!r}'.format(vk))
+_ASCII_VKS = tuple(_lookup_vk(chr(c)) for c in range(128))
+
+
+def _key_to_vk(key):
+    if len(key) == 1 and key < '\x80':
+        return _ASCII_VKS[ord(key)]
+    return _lookup_vk(key)
+
 
+# The name of every virtual key, or `None` if it doesn't have any.
+_VK_TO_KEY = tuple(names[0] if names else None for names in KEYS)
 
+
+# The returned structure is shared, so it must only be copied (for example, into an array).
+@functools.lru_cache(512)
 def _vk_to_kbd_input(vk, down):
+    if not 0 <= vk <= 0xff:
+        raise ValueError('Unknown virtual key {!r}'.format(vk))
+
+    # Some programs (mostly games) look at the scan code rather than the virtual key, so include both.
+    scan = _VK_TO_SCAN[vk]
+    flags = 0 if down else KEYEVENTF_KEYUP
+    if scan & 0xff00:
+        flags |= KEYEVENTF_EXTENDEDKEY
+
     return INPUT(type=INPUT_KEYBOARD, value=INPUTUNION(ki=KEYBDINPUT(
         wVk=vk,
-        wScan=0,
-        dwFlags=(KEYEVENTF_KEYUP, 0)[down],
+        wScan=scan & 0xff,
+        dwFlags=flags,
         time=0,
-        dwExtraInfo=None
+        dwExtraInfo=0
     )))
 
 
-def _key_as_kbd_inputs(key):
-    vks = list(map(_key_to_vk, key.split('+')))
-    for vk in vks:
-        yield _vk_to_kbd_input(vk, True)
-    for vk in reversed(vks):
-        yield _vk_to_kbd_input(vk, False)
+# The returned array is shared, so it must not be modified.
+@functools.lru_cache(512)
+def _key_inputs(key):
+    vks = tuple(map(_key_to_vk, key.split('+')))
+    events = [(vk, True) for vk in vks] + [(vk, False) for vk in reversed(vks)]
+    return _input_array(len(events))(*(_vk_to_kbd_input(vk, down) for vk, down in events))
+
+
+# The returned array is shared, so it must not be modified.
+@functools.lru_cache(256)
+def _hold_inputs(keys, down):
+    return _input_array(len(keys))(*(_vk_to_kbd_input(_key_to_vk(key), down) for key in keys))
+
+
+# The inputs needed to type a character, as raw bytes so that a whole text can be joined at once.
+# They depend on the keyboard layout, which is part of the key so that changing it is noticed.
+@functools.lru_cache(1024)
+def _char_inputs(c, layout):
+    # Characters outside the BMP don't fit in a WCHAR and can't have a virtual key anyway.
+    if c > '\uffff':
+        return b''
+
+    scan = VkKeyScanW(c)
+    if scan == -1:
+        return b''
+
+    vk = scan & 0xff
+    shift = (scan >> 8) & 0xff
+    modifiers = [mod for bit, mod in ((1, VK_SHIFT), (2, VK_CONTROL), (4, VK_MENU)) if shift & bit]
+
+    events = [(mod, True) for mod in modifiers] + [(vk, True), (vk, False)] + [(mod, False) for mod in modifiers]
+    return b''.join(bytes(_vk_to_kbd_input(vk, down)) for vk, down in events)
+
+
+@functools.lru_cache()
+def _input_array(count):
+    return INPUT * count
 
 
 # ctypes is broken for pointers. ctypes.windll.* functions can be patched in-place but it's simpler not to.
@@ -354,6 +443,8 @@ def _define(fn, res, *args):
 
 user32 = ctypes.WinDLL('user32')
 kernel32 = ctypes.WinDLL('kernel32')
+gdi32 = ctypes.WinDLL('gdi32')
+msvcrt = ctypes.CDLL('msvcrt')
 
 OpenClipboard = _define(user32.OpenClipboard, BOOL, HWND)
 CloseClipboard = _define(user32.CloseClipboard, BOOL)
@@ -367,42 +458,52 @@ GlobalLock = _define(kernel32.GlobalLock, LPVOID, HGLOBAL)
 GlobalUnlock = _define(kernel32.GlobalUnlock, BOOL, HGLOBAL)
 GlobalAlloc = _define(kernel32.GlobalAlloc, HGLOBAL, UINT, ctypes.c_size_t)
 GlobalSize = _define(kernel32.GlobalSize, ctypes.c_size_t, HGLOBAL)
+GlobalFree = _define(kernel32.GlobalFree, HGLOBAL, HGLOBAL)
+
+GetDC = _define(user32.GetDC, HDC, HWND)
+ReleaseDC = _define(user32.ReleaseDC, ctypes.c_int, HWND, HDC)
+
+wcsnlen = _define(msvcrt.wcsnlen, ctypes.c_size_t, ctypes.c_void_p, ctypes.c_size_t)
 
 
 def _parse_pos(x, y):
     # https://docs.microsoft.com/en-us/windows/win32/api/winuser/ns-winuser-mouseinput
     MAX = 65535
 
-    rel = bool(x.imag or y.imag)
-    if rel:
+    # Plain pixel coordinates are by far the most common, so they skip the checks below.
+    if type(x) is int and type(y) is int:
+        w, h = size()
+        return x * MAX // w, y * MAX // h
+
+    if x.imag or y.imag:
         # Relative movement is hard: https://stackoverflow.com/a/72446795/4759433.
         # TL;DR; give up and use absolute position.
         bx, by = mouse()
         x = bx + (x.imag or x.real)
         y = by + (y.imag or y.real)
 
-    if not (0.0 < x < 1.0 or 0.0 < y < 1.0):
-        w, h = size()
-        x /= w
-        y /= h
-
-    x *= MAX
-    y *= MAX
+    # Each axis is scaled on its own, so fractions and pixels can be mixed.
+    # `size` is cached, so this rarely needs to query the system.
+    w, h = size()
+    x = x * MAX if 0.0 < x < 1.0 else x * MAX // w
+    y = y * MAX if 0.0 < y < 1.0 else y * MAX // h
 
-    return int(x), int(y), rel
+    return int(x), int(y)
 
 
 class Resource:
     def __init__(self, val, delete):
         assert val
         self.val = val
-        self.delete = delete
+        # Unlike `__del__`, this also runs on exit while the bound functions are still usable.
+        self._finalizer = weakref.finalize(self, delete, val)
 
-    def __del__(self):
-        self.delete(self.val)
+    def close(self):
+        self._finalizer()
+        self.val = None
 
 
-DESKTOP_DC = Resource(ctypes.windll.user32.GetDC(0), ctypes.windll.user32.ReleaseDC)
+DESKTOP_DC = Resource(GetDC(None), functools.partial(ReleaseDC, None))
 
 
 class POINT(ctypes.Structure):
@@ -412,6 +513,10 @@ class POINT(ctypes.Structure):
         return f'{self.x} {self.y}'
 
 
+# Pointer-sized unsigned integer.
+ULONG_PTR = ctypes.c_size_t
+
+
 class MOUSEINPUT(ctypes.Structure):
     """
     https://docs.microsoft.com/en-us/windows/desktop/api/winuser/ns-winuser-tagmouseinput
@@ -425,12 +530,12 @@ class MOUSEINPUT(ctypes.Structure):
     } MOUSEINPUT, *PMOUSEINPUT, *LPMOUSEINPUT;
     """
     _fields_ = [
-        ('dx', ctypes.c_long),
-        ('dy', ctypes.c_long),
-        ('mouseData', ctypes.c_long),
-        ('dwFlags', ctypes.c_long),
-        ('time', ctypes.c_long),
-        ('dwExtraInfo', ctypes.POINTER(ctypes.c_ulong))
+        ('dx', LONG),
+        ('dy', LONG),
+        ('mouseData', DWORD),
+        ('dwFlags', DWORD),
+        ('time', DWORD),
+        ('dwExtraInfo', ULONG_PTR)
     ]
 
 
@@ -446,11 +551,11 @@ class KEYBDINPUT(ctypes.Structure):
     } KEYBDINPUT, *PKEYBDINPUT, *LPKEYBDINPUT;
     """
     _fields_ = [
-        ('wVk', ctypes.c_short),
-        ('wScan', ctypes.c_short),
-        ('dwFlags', ctypes.c_long),
-        ('time', ctypes.c_long),
-        ('dwExtraInfo', ctypes.POINTER(ctypes.c_ulong))
+        ('wVk', WORD),
+        ('wScan', WORD),
+        ('dwFlags', DWORD),
+        ('time', DWORD),
+        ('dwExtraInfo', ULONG_PTR)
     ]
 
 
@@ -464,9 +569,9 @@ class HARDWAREINPUT(ctypes.Structure):
     } HARDWAREINPUT, *PHARDWAREINPUT, *LPHARDWAREINPUT;
     """
     _fields_ = [
-        ('uMsg', ctypes.c_long),
-        ('wParamL', ctypes.c_short),
-        ('wParamH', ctypes.c_short)
+        ('uMsg', DWORD),
+        ('wParamL', WORD),
+        ('wParamH', WORD)
     ]
 
 
@@ -487,7 +592,24 @@ class INPUT(ctypes.Structure):
         } DUMMYUNIONNAME;
     } INPUT, *PINPUT, *LPINPUT;
     """
-    _fields_ = [('type', ctypes.c_long), ('value', INPUTUNION)]
+    _fields_ = [('type', DWORD), ('value', INPUTUNION)]
+
+
+_INPUT_SIZE = ctypes.sizeof(INPUT)
+
+# The down and up events of each button, shared by every click, so they must not be modified.
+_BUTTON_INPUTS = {
+    button: _input_array(2)(*(INPUT(type=INPUT_MOUSE, value=INPUTUNION(mi=MOUSEINPUT(dwFlags=flag)))
+                              for flag in flags))
+    for button, flags in BUTTON_TO_EVENTS.items()
+}
+
+# An absolute move, used as a template so that only the coordinates need to be written for each point.
+_MOVE_INPUT = bytes(INPUT(type=INPUT_MOUSE, value=INPUTUNION(mi=MOUSEINPUT(
+    dwFlags=MOUSEEVENTF_MOVE | MOUSEEVENTF_ABSOLUTE,
+))))
+_MOVE_DX_OFFSET = INPUT.value.offset + MOUSEINPUT.dx.offset
+_MOVE_DXDY = struct.Struct('ll')
 
 
 class RECT(ctypes.Structure):
@@ -569,6 +691,87 @@ class BITMAPINFO(ctypes.Structure):
     _fields_ = [('bmiHeader', BITMAPINFOHEADER), ('bmiColors', RGBQUAD)]
 
 
+class KBDLLHOOKSTRUCT(ctypes.Structure):
+    """
+    https://docs.microsoft.com/en-us/windows/win32/api/winuser/ns-winuser-kbdllhookstruct
+    typedef struct tagKBDLLHOOKSTRUCT {
+        DWORD     vkCode;
+        DWORD     scanCode;
+        DWORD     flags;
+        DWORD     time;
+        ULONG_PTR dwExtraInfo;
+    } KBDLLHOOKSTRUCT, *LPKBDLLHOOKSTRUCT, *PKBDLLHOOKSTRUCT;
+    """
+    _fields_ = [
+        ('vkCode', DWORD),
+        ('scanCode', DWORD),
+        ('flags', DWORD),
+        ('time', DWORD),
+        ('dwExtraInfo', ULONG_PTR),
+    ]
+
+
+class MSLLHOOKSTRUCT(ctypes.Structure):
+    """
+    https://docs.microsoft.com/en-us/windows/win32/api/winuser/ns-winuser-msllhookstruct
+    typedef struct tagMSLLHOOKSTRUCT {
+        POINT     pt;
+        DWORD     mouseData;
+        DWORD     flags;
+        DWORD     time;
+        ULONG_PTR dwExtraInfo;
+    } MSLLHOOKSTRUCT, *LPMSLLHOOKSTRUCT, *PMSLLHOOKSTRUCT;
+    """
+    _fields_ = [
+        ('pt', POINT),
+        ('mouseData', DWORD),
+        ('flags', DWORD),
+        ('time', DWORD),
+        ('dwExtraInfo', ULONG_PTR),
+    ]
+
+
+# https://docs.microsoft.com/en-us/windows/win32/api/winuser/nc-winuser-hookproc
+HOOKPROC = ctypes.WINFUNCTYPE(LPARAM, ctypes.c_int, WPARAM, LPARAM)
+
+
+# Per-thread buffers reused across calls.
+_local = threading.local()
+
+GetCursorPos = _define(user32.GetCursorPos, BOOL, ctypes.POINTER(POINT))
+SendInput = _define(user32.SendInput, UINT, UINT, ctypes.POINTER(INPUT), ctypes.c_int)
+
+VkKeyScanW = _define(user32.VkKeyScanW, ctypes.c_short, WCHAR)
+GetKeyboardLayout = _define(user32.GetKeyboardLayout, HANDLE, DWORD)
+MapVirtualKeyW = _define(user32.MapVirtualKeyW, UINT, UINT, UINT)
+
+# The scan code of every virtual key. Extended keys have an 0xE0 or 0xE1 prefix in the high byte.
+_VK_TO_SCAN = tuple(MapVirtualKeyW(vk, MAPVK_VK_TO_VSC_EX) for vk in range(256))
+
+GetAsyncKeyState = _define(user32.GetAsyncKeyState, ctypes.c_short, ctypes.c_int)
+
+SetWindowsHookExW = _define(user32.SetWindowsHookExW, HANDLE, ctypes.c_int, HOOKPROC, HMODULE, DWORD)
+CallNextHookEx = _define(user32.CallNextHookEx, LPARAM, HANDLE, ctypes.c_int, WPARAM, LPARAM)
+UnhookWindowsHookEx = _define(user32.UnhookWindowsHookEx, BOOL, HANDLE)
+GetMessageW = _define(user32.GetMessageW, BOOL, ctypes.POINTER(MSG), HWND, UINT, UINT)
+PeekMessageW = _define(user32.PeekMessageW, BOOL, ctypes.POINTER(MSG), HWND, UINT, UINT, UINT)
+PostThreadMessageW = _define(user32.PostThreadMessageW, BOOL, DWORD, UINT, WPARAM, LPARAM)
+GetModuleHandleW = _define(kernel32.GetModuleHandleW, HMODULE, LPCWSTR)
+GetCurrentThreadId = _define(kernel32.GetCurrentThreadId, DWORD)
+
+GetSystemMetrics = _define(user32.GetSystemMetrics, ctypes.c_int, ctypes.c_int)
+
+CreateCompatibleDC = _define(gdi32.CreateCompatibleDC, HDC, HDC)
+DeleteDC = _define(gdi32.DeleteDC, BOOL, HDC)
+CreateDIBSection = _define(gdi32.CreateDIBSection, HANDLE, HDC, ctypes.POINTER(BITMAPINFO), UINT,
+                           ctypes.POINTER(ctypes.c_void_p), HANDLE, DWORD)
+SelectObject = _define(gdi32.SelectObject, HANDLE, HDC, HANDLE)
+DeleteObject = _define(gdi32.DeleteObject, BOOL, HANDLE)
+BitBlt = _define(gdi32.BitBlt, BOOL, HDC, ctypes.c_int, ctypes.c_int, ctypes.c_int, ctypes.c_int,
+                 HDC, ctypes.c_int, ctypes.c_int, DWORD)
+GdiFlush = _define(gdi32.GdiFlush, BOOL)
+
+
 # Mouse
 
 
@@ -580,25 +783,46 @@ def mouse():
     );
     Returns x, y as int
     """
-    pt = POINT()
-    ctypes.windll.user32.GetCursorPos(ctypes.byref(pt))
+    try:
+        pt, pt_ref = _local.point
+    except AttributeError:
+        pt = POINT()
+        pt_ref = ctypes.byref(pt)
+        _local.point = pt, pt_ref
+
+    GetCursorPos(pt_ref)
     return Position(pt.x, pt.y)
 
 
 
 def move(x, y):
-    x, y, rel = _parse_pos(x, y)
-    MOUSEEVENTF_ABSOLUTE = 0x8000
-    MOUSEEVENTF_MOVE = 0x0001
-    inputs = INPUT(type=INPUT_MOUSE, value=INPUTUNION(mi=MOUSEINPUT(
-        dx=x,
-        dy=y,
-        mouseData=0,
-        dwFlags=MOUSEEVENTF_MOVE | MOUSEEVENTF_ABSOLUTE,
-        time=0,
-        dwExtraInfo=None,
-    )))
-    ctypes.windll.user32.SendInput(1, ctypes.byref(inputs), ctypes.sizeof(inputs))
+    try:
+        inputs, mi, inputs_ref = _local.move
+    except AttributeError:
+        inputs = INPUT(type=INPUT_MOUSE, value=INPUTUNION(mi=MOUSEINPUT(
+            mouseData=0,
+            dwFlags=MOUSEEVENTF_MOVE | MOUSEEVENTF_ABSOLUTE,
+            time=0,
+            dwExtraInfo=0,
+        )))
+        mi = inputs.value.mi
+        inputs_ref = ctypes.byref(inputs)
+        _local.move = inputs, mi, inputs_ref
+
+    mi.dx, mi.dy = _parse_pos(x, y)
+    SendInput(1, inputs_ref, _INPUT_SIZE)
+
+
+def move_path(points):
+    points = tuple(points)
+    data = bytearray(_MOVE_INPUT * len(points))
+    for i, (x, y) in enumerate(points):
+        if x.imag or y.imag:
+            raise ValueError('relative positions are not supported in a path')
+        _MOVE_DXDY.pack_into(data, i * _INPUT_SIZE + _MOVE_DX_OFFSET, *_parse_pos(x, y))
+
+    # A single call so that the whole path is followed without anything in between.
+    SendInput(len(points), _input_array(len(points)).from_buffer(data), _INPUT_SIZE)
 
 
 def click(*args):
@@ -610,28 +834,29 @@ def click(*args):
     elif argc == 2:
         x, y = args
         button = MB.L
-        # TODO move mouse with the call directly
-        move(x, y)
     elif argc == 3:
         x, y, button = args
         button = MB.parse(button)
-        # TODO move mouse with the call directly
-        move(x, y)
     else:
         raise TypeError('0, 1, 2 or 3 arguments required, but {} given'.format(argc))
 
-    flags = BUTTON_TO_EVENTS[button]
-    count = ctypes.c_uint(1)
-    for flag in flags:
-        inputs = INPUT(type=INPUT_MOUSE, value=INPUTUNION(mi=MOUSEINPUT(
-            dx=0,
-            dy=0,
-            mouseData=0,
-            dwFlags=flag,
-            time=0,
-            dwExtraInfo=None,
-        )))
-        ctypes.windll.user32.SendInput(count, ctypes.byref(inputs), ctypes.sizeof(inputs))
+    # All events go in the same call so that no other input can sneak in between them.
+    inputs = _BUTTON_INPUTS[button]
+    if argc >= 2:
+        try:
+            moved, mi = _local.click
+        except AttributeError:
+            moved = _input_array(3)(INPUT(type=INPUT_MOUSE, value=INPUTUNION(mi=MOUSEINPUT(
+                dwFlags=MOUSEEVENTF_MOVE | MOUSEEVENTF_ABSOLUTE,
+            ))))
+            mi = moved[0].value.mi
+            _local.click = moved, mi
+
+        mi.dx, mi.dy = _parse_pos(x, y)
+        moved[1:] = inputs
+        inputs = moved
+
+    SendInput(len(inputs), inputs, _INPUT_SIZE)
 
 
 # Keyboard
@@ -646,103 +871,257 @@ def press(*keys):
         int     cbSize
     );
     """
-    inputs = [i for key in keys for i in _key_as_kbd_inputs(key)]
-    count = len(inputs)
-    inputs = (INPUT * count)(*inputs)
-    ctypes.windll.user32.SendInput(count, inputs, ctypes.sizeof(INPUT))
+    if len(keys) == 1:
+        inputs = _key_inputs(keys[0])
+    else:
+        # Join the prebuilt inputs of every key so they're all sent at once.
+        parts = [_key_inputs(key) for key in keys]
+        inputs = _input_array(sum(map(len, parts)))()
+        offset = ctypes.addressof(inputs)
+        for part in parts:
+            ctypes.memmove(offset, part, ctypes.sizeof(part))
+            offset += ctypes.sizeof(part)
+
+    SendInput(len(inputs), inputs, _INPUT_SIZE)
 
 
 @contextmanager
 def hold(*keys):
-    count = len(keys)
-    inputs = (INPUT * count)(*(_vk_to_kbd_input(_key_to_vk(key), True) for key in keys))
-    ctypes.windll.user32.SendInput(count, inputs, ctypes.sizeof(INPUT))
+    inputs = _hold_inputs(keys, True)
+    SendInput(len(inputs), inputs, _INPUT_SIZE)
     try:
         yield
     finally:
-        inputs = (INPUT * count)(*(_vk_to_kbd_input(_key_to_vk(key), False) for key in keys))
-        ctypes.windll.user32.SendInput(count, inputs, ctypes.sizeof(INPUT))
+        inputs = _hold_inputs(keys, False)
+        SendInput(len(inputs), inputs, _INPUT_SIZE)
 
 
 def write(text):
-    inputs = []
-    for c in text:
-        scan = ctypes.windll.user32.VkKeyScanA(ord(c))
-        if scan == 0xffff:
-            continue
+    layout = GetKeyboardLayout(0)
+    data = b''.join([_char_inputs(c, layout) for c in text])
+    count = len(data) // _INPUT_SIZE
+    SendInput(count, _input_array(count).from_buffer_copy(data), _INPUT_SIZE)
 
-        vk = scan & 0xff
-        shift = (scan >> 8) & 0xff
 
-        if shift & 1:
-            inputs.append(_vk_to_kbd_input(VK_SHIFT, True))
-        if shift & 2:
-            inputs.append(_vk_to_kbd_input(VK_CONTROL, True))
-        if shift & 4:
-            inputs.append(_vk_to_kbd_input(VK_MENU, True))
+@contextmanager
+def batch():
+    # SendInput is cheap enough that there is no need to queue anything.
+    yield
+
+
+# The mouse messages seen by the hook, and the virtual key and state they correspond to.
+_MOUSE_MESSAGE_TO_VK = {
+    WM_LBUTTONDOWN: (0x01, True),
+    WM_LBUTTONUP: (0x01, False),
+    WM_RBUTTONDOWN: (0x02, True),
+    WM_RBUTTONUP: (0x02, False),
+    WM_MBUTTONDOWN: (0x04, True),
+    WM_MBUTTONUP: (0x04, False),
+}
 
-        inputs.append(_vk_to_kbd_input(vk, True))
-        inputs.append(_vk_to_kbd_input(vk, False))
+# The hooks only see the left and right modifiers, but like `GetKeyboardState`,
+# changes to the generic modifier are reported too.
+_SIDE_TO_GENERIC_VK = {
+    0xA0: VK_SHIFT,
+    0xA1: VK_SHIFT,
+    0xA2: VK_CONTROL,
+    0xA3: VK_CONTROL,
+    0xA4: VK_MENU,
+    0xA5: VK_MENU,
+}
 
-        if shift & 1:
-            inputs.append(_vk_to_kbd_input(VK_SHIFT, False))
-        if shift & 2:
-            inputs.append(_vk_to_kbd_input(VK_CONTROL, False))
-        if shift & 4:
-            inputs.append(_vk_to_kbd_input(VK_MENU, False))
+# The `_Listener` of every active `_Events`. Replaced rather than modified so that the hook thread can iterate it.
+_listeners = frozenset()
+# Reentrant because an `_Events` may be garbage-collected (and unregister itself) while the lock is held.
+_listeners_lock = threading.RLock()
+_hook_thread = None
+_hook_thread_id = None
 
-    count = len(inputs)
-    inputs = (INPUT * count)(*inputs)
-    ctypes.windll.user32.SendInput(count, inputs, ctypes.sizeof(INPUT))
+# Which keys the hooks have seen down, used to ignore the repeated key downs of keys being held.
+# Only the hook thread uses it, and there is never more than one running.
+_hook_down = bytearray(256)
 
+# `get_running_loop` is new in Python 3.7. Before, `get_event_loop` returned the running loop inside coroutines.
+_get_running_loop = getattr(asyncio, 'get_running_loop', asyncio.get_event_loop)
 
-class _Events:
+
+class _Listener:
     def __init__(self):
-        self._before = ctypes.create_string_buffer(256)
-        self._after = ctypes.create_string_buffer(256)
-        self._events = []
+        self.queue = queue.Queue()
+        # The loop and `asyncio.Event` of a coroutine waiting for events, if any.
+        self.waiter = None
+
+    def push(self, event):
+        self.queue.put(event)
+        waiter = self.waiter
+        if waiter:
+            loop, ready = waiter
+            try:
+                loop.call_soon_threadsafe(ready.set)
+            except RuntimeError:
+                pass  # the loop is closed
+
+
+def _hook_emit(vk, down):
+    if _hook_down[vk] == down:
+        return
+
+    _hook_down[vk] = down
+    key = _VK_TO_KEY[vk]
+    if key is not None:
+        for listener in _listeners:
+            listener.push((key, down))
+
+    generic = _SIDE_TO_GENERIC_VK.get(vk)
+    if generic is not None:
+        left = vk & ~1
+        _hook_emit(generic, bool(_hook_down[left] or _hook_down[left + 1]))
+
+
+@HOOKPROC
+def _keyboard_hook(code, wparam, lparam):
+    """
+    https://docs.microsoft.com/en-us/windows/win32/winmsg/lowlevelkeyboardproc
+    """
+    if code == HC_ACTION and wparam in (WM_KEYDOWN, WM_SYSKEYDOWN, WM_KEYUP, WM_SYSKEYUP):
+        info = KBDLLHOOKSTRUCT.from_address(lparam)
+        _hook_emit(info.vkCode & 0xff, wparam in (WM_KEYDOWN, WM_SYSKEYDOWN))
+    return CallNextHookEx(None, code, wparam, lparam)
 
-    @staticmethod
-    def _refetch(buffer):
-        # `GetKeyState` before `GetKeyboardState` seems to be needed for some reason.
-        ctypes.windll.user32.GetKeyState(0)
-        ctypes.windll.user32.GetKeyboardState(buffer)
-        buffer.raw = bytes(x & 0x80 for x in buffer.raw)
 
-    def _fill_events(self):
-        self._refetch(self._after)
+@HOOKPROC
+def _mouse_hook(code, wparam, lparam):
+    """
+    https://docs.microsoft.com/en-us/windows/win32/winmsg/lowlevelmouseproc
+    """
+    if code == HC_ACTION:
+        if wparam in _MOUSE_MESSAGE_TO_VK:
+            _hook_emit(*_MOUSE_MESSAGE_TO_VK[wparam])
+        elif wparam in (WM_XBUTTONDOWN, WM_XBUTTONUP):
+            # The high word is 1 for the first X button (VK_XBUTTON1 = 5) and 2 for the second.
+            xbutton = MSLLHOOKSTRUCT.from_address(lparam).mouseData >> 16
+            _hook_emit(4 + xbutton, wparam == WM_XBUTTONDOWN)
+    return CallNextHookEx(None, code, wparam, lparam)
+
+
+def _run_hooks(result, started, abandoned):
+    hooks = []
+    try:
+        msg = MSG()
+        # The thread needs a message queue before anyone can post WM_QUIT to it.
+        PeekMessageW(ctypes.byref(msg), None, 0, 0, PM_NOREMOVE)
+
+        module = GetModuleHandleW(None)
+        hooks.append(SetWindowsHookExW(WH_KEYBOARD_LL, _keyboard_hook, module, 0))
+        hooks.append(SetWindowsHookExW(WH_MOUSE_LL, _mouse_hook, module, 0))
+        if not all(hooks):
+            raise ctypes.WinError()
+
+        # Keys already held down must still report being released (and not being pressed again).
+        for vk in range(256):
+            _hook_down[vk] = (GetAsyncKeyState(vk) & 0x8000) != 0
+
+        result.append(GetCurrentThreadId())
+        started.set()
+        if abandoned.is_set():
+            return
+
+        # Low-level hooks are called while the thread that installed them waits for messages.
+        while GetMessageW(ctypes.byref(msg), None, 0, 0) > 0:
+            pass
+    except BaseException as e:
+        if started.is_set():
+            raise
+        result.append(e)
+    finally:
+        for hook in hooks:
+            if hook:
+                UnhookWindowsHookEx(hook)
+        started.set()
+
+
+def _listen(listener):
+    global _listeners, _hook_thread, _hook_thread_id
+    with _listeners_lock:
+        if _hook_thread_id is None:
+            # The previous hook thread may still be stopping, and two must not run at the same time.
+            if _hook_thread is not None:
+                _hook_thread.join(HOOKS_TIMEOUT)
+                if _hook_thread.is_alive():
+                    raise RuntimeError('the previous input hooks did not stop in time')
+                _hook_thread = None
+
+            result = []
+            started = threading.Event()
+            abandoned = threading.Event()
+            thread = threading.Thread(target=_run_hooks, args=(result, started, abandoned), daemon=True)
+            thread.start()
+            if not started.wait(HOOKS_TIMEOUT):
+                # If the thread gets to start after all, it will either see this or be told to quit.
+                abandoned.set()
+                if started.is_set() and isinstance(result[0], int):
+                    PostThreadMessageW(result[0], WM_QUIT, 0, 0)
+                # Either way it's still running, and the next hooks must wait for it to stop first.
+                _hook_thread = thread
+                raise RuntimeError('the input hooks did not start in time')
+
+            if not result:
+                raise RuntimeError('the input hooks could not be started')
+            if isinstance(result[0], BaseException):
+                raise result[0]
+
+            _hook_thread = thread
+            _hook_thread_id = result[0]
+
+        _listeners = _listeners | {listener}
+
+
+def _unlisten(listener):
+    global _listeners, _hook_thread_id
+    with _listeners_lock:
+        _listeners = _listeners - {listener}
+        # Nobody is listening anymore, so the hooks don't need to slow down everyone's input.
+        if not _listeners and _hook_thread_id is not None:
+            PostThreadMessageW(_hook_thread_id, WM_QUIT, 0, 0)
+            _hook_thread_id = None
 
-        for vk, (b, a) in enumerate(zip(self._before.raw, self._after.raw)):
-            if b != a:
-                self._events.append((_vk_to_key(vk), bool(a)))
 
-        self._before, self._after = self._after, self._before
+class _Events:
+    def __init__(self):
+        # Listening right away means that no events are missed before the first one is requested.
+        self._listener = _Listener()
+        _listen(self._listener)
+        self._finalizer = weakref.finalize(self, _unlisten, self._listener)
 
     def __iter__(self):
-        self._refetch(self._before)
         return self
 
     def __next__(self):
-        if not self._events:
-            self._fill_events()
-            while not self._events:
-                time.sleep(EVENTS_POLL_DELAY)
-                self._fill_events()
-
-        return self._events.pop()
+        while True:
+            try:
+                return self._listener.queue.get(timeout=EVENTS_WAIT_TIMEOUT)
+            except queue.Empty:
+                pass
 
     def __aiter__(self):
-        self._refetch(self._before)
         return self
 
     async def __anext__(self):
-        if not self._events:
-            self._fill_events()
-            while not self._events:
-                await asyncio.sleep(EVENTS_POLL_DELAY)
-                self._fill_events()
-
-        return self._events.pop()
+        listener = self._listener
+        while True:
+            try:
+                return listener.queue.get_nowait()
+            except queue.Empty:
+                pass
+
+            ready = asyncio.Event()
+            listener.waiter = _get_running_loop(), ready
+            try:
+                # An event may have arrived before the waiter was set, and then `ready` would never be set.
+                if listener.queue.empty():
+                    await ready.wait()
+            finally:
+                listener.waiter = None
 
 
 def events():
@@ -754,71 +1133,107 @@ def events():
 
 def holding(key):
     """
-    https://docs.microsoft.com/en-us/windows/desktop/api/winuser/nf-winuser-getkeystate
-    SHORT GetKeyState(
-        int nVirtKey
+    https://docs.microsoft.com/en-us/windows/win32/api/winuser/nf-winuser-getasynckeystate
+    SHORT GetAsyncKeyState(
+        int vKey
     );
     """
-    return (ctypes.windll.user32.GetKeyState(_key_to_vk(key)) & 0x80) != 0
+    # Unlike `GetKeyState`, this doesn't depend on the calling thread processing messages to be up-to-date.
+    return (GetAsyncKeyState(_key_to_vk(key)) & 0x8000) != 0
 
 
 def color(x, y):
     """
-    https://docs.microsoft.com/en-us/windows/desktop/api/wingdi/nf-wingdi-getpixel
-    COLORREF GetPixel(
-        HDC hdc,
-        int x,
-        int y
-    );
-    Returns colors as zbgr int
+    https://docs.microsoft.com/en-us/windows/desktop/api/wingdi/nf-wingdi-bitblt
+
+    `GetPixel` on the desktop DC is slow, so a 1x1 screenshot is kept around
+    and moved to the requested position instead, which costs a single `BitBlt`.
     """
-    zbgr = ctypes.windll.gdi32.GetPixel(DESKTOP_DC.val, x, y)
-    return Color(
-        (zbgr >> 0) & 0xff,
-        (zbgr >> 8) & 0xff,
-        (zbgr >> 16) & 0xff,
-    )
+    try:
+        pixel = _local.color
+    except AttributeError:
+        pixel = _local.color = _Screenshot(x, y, 1, 1)
+    else:
+        pixel._x = x
+        pixel._y = y
+        pixel.refresh()
+
+    return pixel[0]
 
 
 # Clipboard
 
 
+@contextmanager
+def clipboard():
+    # The clipboard is opened by (and belongs to) a thread, so each one counts its own `clipboard` blocks.
+    # Only the outermost one opens and closes the clipboard.
+    depth = getattr(_local, 'clipboard_depth', 0)
+    if not depth and not OpenClipboard(None):
+        raise ctypes.WinError()
+
+    _local.clipboard_depth = depth + 1
+    try:
+        yield
+    finally:
+        _local.clipboard_depth = depth
+        if not depth:
+            CloseClipboard()
+
+
 def paste():
-    OpenClipboard(None)
-    handle = GetClipboardData(CF_UNICODETEXT)
-    cstring = GlobalLock(handle)
-    size = GlobalSize(handle)
-    if cstring and size:
-        raw_data = ctypes.create_string_buffer(size)
-        # (ctypes.c_byte * size).from_address(cstring)[:] would give us a (less efficient) Python list.
-        # bytes.decode does not seem happy taking c_byte_Array_# as input parameter unfortunately.
-        # Using a temporary buffer for strings and moving the data seems to be the best approach.
-        ctypes.memmove(raw_data, cstring, size)
-        text = raw_data.raw.decode('utf-16le').rstrip('\0')
-    else:
-        text = None
+    with clipboard():
+        handle = GetClipboardData(CF_UNICODETEXT)
+        if not handle:
+            return None
 
-    GlobalUnlock(handle)
-    CloseClipboard()
-    return text
+        cstring = GlobalLock(handle)
+        if not cstring:
+            return None
+
+        try:
+            # The allocation may be larger than the text, so only read up to the null terminator.
+            return ctypes.wstring_at(cstring, wcsnlen(cstring, GlobalSize(handle) // 2))
+        finally:
+            GlobalUnlock(handle)
 
 
 def copy(text):
-    buffer = text.encode('utf-16le')
-    OpenClipboard(None)
-    EmptyClipboard()
-    handle = GlobalAlloc(GMEM_MOVEABLE | GMEM_ZEROINIT, len(buffer) + 2)
-    cstring = GlobalLock(handle)
-    ctypes.memmove(cstring, buffer, len(buffer))
-    GlobalUnlock(handle)
-    SetClipboardData(CF_UNICODETEXT, handle)
-    CloseClipboard()
+    # wchar_t is UTF-16 on Windows, so characters outside the BMP need two (plus the null terminator).
+    length = len(text) + 1
+    if text and max(text) > '\uffff':
+        length += sum(c > '\uffff' for c in text)
+
+    handle = GlobalAlloc(GMEM_MOVEABLE, length * ctypes.sizeof(WCHAR))
+    if not handle:
+        raise ctypes.WinError()
+
+    try:
+        cstring = GlobalLock(handle)
+        if not cstring:
+            raise ctypes.WinError()
+
+        # Encoding straight into the global memory avoids an intermediate buffer.
+        (WCHAR * length).from_address(cstring).value = text
+        GlobalUnlock(handle)
+
+        with clipboard():
+            EmptyClipboard()
+            if not SetClipboardData(CF_UNICODETEXT, handle):
+                raise ctypes.WinError()
+    except BaseException:
+        # The clipboard only owns the memory once it has been set successfully.
+        GlobalFree(handle)
+        raise
 
 
 # Screen
 
 
-@functools.lru_cache(1)
+_screen_size = None
+_screen_size_time = 0.0
+
+
 def size():
     # https://docs.microsoft.com/en-us/windows/win32/api/winuser/nf-winuser-getsystemmetrics
     """
@@ -829,41 +1244,60 @@ def size():
     assert res
     return rect.right, rect.bottom
     """
-    SM_CXSCREEN = 0
-    SM_CYSCREEN = 1
-    width = ctypes.windll.user32.GetSystemMetrics(SM_CXSCREEN)
-    height = ctypes.windll.user32.GetSystemMetrics(SM_CYSCREEN)
-    return width, height
+    global _screen_size, _screen_size_time
+    now = time.monotonic()
+    if now - _screen_size_time > SCREEN_SIZE_REFRESH or not _screen_size:
+        SM_CXSCREEN = 0
+        SM_CYSCREEN = 1
+        _screen_size = GetSystemMetrics(SM_CXSCREEN), GetSystemMetrics(SM_CYSCREEN)
+        _screen_size_time = now
+
+    return _screen_size
+
+
+def _free_screenshot(mem_dc, bmp, old_bmp):
+    # The bitmap can't be deleted while it's selected into the DC, so the DC's original one is put back first.
+    if old_bmp and old_bmp != HGDI_ERROR:
+        SelectObject(mem_dc, old_bmp)
+    if bmp:
+        DeleteObject(bmp)
+    DeleteDC(mem_dc)
 
 
 class _Screenshot:
     def __init__(self, x, y, width, height):
-        self._mem_dc = Resource(ctypes.windll.gdi32.CreateCompatibleDC(0), ctypes.windll.gdi32.DeleteDC)
-        self._bmp = Resource(ctypes.windll.gdi32.CreateCompatibleBitmap(DESKTOP_DC.val, width, height),
-                             ctypes.windll.gdi32.DeleteObject)
-        so = ctypes.windll.gdi32.SelectObject(self._mem_dc.val, self._bmp.val)
-        assert so and so != -1 and so != 0xffffffffffffffff
-
+        self._mem_dc = CreateCompatibleDC(None)
+        assert self._mem_dc
         self._bmp_info = BITMAPINFO(bmiHeader=BITMAPINFOHEADER(
-            biBitCount=24,
+            biBitCount=32,
             biCompression=BI_RGB,
             biPlanes=1,
             biHeight=-height,
             biWidth=width,
-            biSize=ctypes.sizeof(BITMAPINFO),
+            biSize=ctypes.sizeof(BITMAPINFOHEADER),
         ))
+
+        # The DIB section's pixels live in memory we can read directly, so refreshing only needs a `BitBlt`.
+        bits = ctypes.c_void_p()
+        bmp = CreateDIBSection(self._mem_dc, ctypes.byref(self._bmp_info), DIB_RGB_COLORS, ctypes.byref(bits), None, 0)
+        old_bmp = SelectObject(self._mem_dc, bmp) if bmp else None
+        # A single finalizer, so that everything is freed in the right order even if `close` is never called.
+        self._finalizer = weakref.finalize(self, _free_screenshot, self._mem_dc, bmp, old_bmp)
+        assert bmp and old_bmp and old_bmp != HGDI_ERROR
+
         self._x = x
         self._y = y
         self._width = width
         self._height = height
-        self._pixels = ctypes.create_string_buffer(width * height * 3)
+        # Every pixel is a single little-endian 0xXXRRGGBB integer, and rows have no padding.
+        self._pixels = (ctypes.c_uint32 * (width * height)).from_address(bits.value)
         self._rgb = None
         self.refresh()
 
     def refresh(self):
         self._rgb = None
-        res = ctypes.windll.gdi32.BitBlt(
-            self._mem_dc.val,
+        res = BitBlt(
+            self._mem_dc,
             0,
             0,
             self._width,
@@ -874,16 +1308,8 @@ class _Screenshot:
             SRCCOPY,
         )
         assert res
-        res = ctypes.windll.gdi32.GetDIBits(
-            self._mem_dc.val,
-            self._bmp.val,
-            0,
-            self._height,
-            self._pixels,
-            ctypes.byref(self._bmp_info),
-            DIB_RGB_COLORS,
-        )
-        assert res and res != ERROR_INVALID_PARAMETER
+        # GDI may batch the blit; it must be done before the bits are read.
+        GdiFlush()
 
     def __len__(self):
         return self._width * self._height
@@ -896,16 +1322,28 @@ class _Screenshot:
             key = key[1] * self._width + key[0]
         if not isinstance(key, int):
             raise TypeError('only tuple or int supported')
-        key *= 3
-        return Color(*self._pixels.raw[key:key + 3][::-1])
+        xrgb = self._pixels[key]
+        return Color((xrgb >> 16) & 0xff, (xrgb >> 8) & 0xff, xrgb & 0xff)
 
     def __bytes__(self):
         if not self._rgb:
-            rgb = bytearray(self._pixels.raw)
-            rgb[::3], rgb[2::3] = rgb[2::3], rgb[::3]  # BGR -> RGB
+            bgrx = bytes(self._pixels)
+            rgb = bytearray(len(bgrx) // 4 * 3)
+            rgb[::3], rgb[1::3], rgb[2::3] = bgrx[2::4], bgrx[1::4], bgrx[::4]  # BGRX -> RGB
             self._rgb = bytes(rgb)
 
         return self._rgb
 
+    def close(self):
+        self._finalizer()
+        self._pixels = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+
 def screenshot(x, y, w, h):
     return _Screenshot(x, y, w, h)
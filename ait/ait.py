@@ -111,6 +111,18 @@ def move(x, y):
     """
 
 
+@_proxy
+def move_path(points):
+    """
+    Moves the mouse through each of the given `(x, y)` points, in order, as fast as possible.
+
+    The points can use absolute coordinates or percentages like in `move`, but not relative ones.
+    All the movement is sent at once, so applications still see every point along the path:
+
+    >>> move_path([(100, 100), (110, 105), (120, 110)])
+    """
+
+
 @_proxy
 def click(*args):
     """
@@ -202,7 +214,30 @@ def events():
 
     The iterator can also be used in asynchronous contexts (`async for`).
 
-    If multiple events occured between iteration steps, they're returned in arbitrary order.
+    Events are delivered as they happen, in order, even if several occur between iteration steps.
+    Holding a key down only produces a single event until it is released.
+    """
+
+
+@_proxy
+def batch():
+    """
+    Return an object to be used as a context-manager that will queue the mouse and keyboard
+    actions done inside it and perform all of them at once when it's closed.
+
+    This is useful when the cost of each action is high (for example, on Linux, where each
+    action has to go through `xdotool`):
+
+    >>> with batch():
+    ...     for x in range(100, 200):
+    ...         move(x, 100)
+    ...     click()
+    ...     write('Hello, world!')
+
+    When the mouse is moved several times in a row, only the last movement is performed.
+
+    Only the actions done by the thread that opened the batch are queued. If the block raises,
+    the queued actions are discarded instead of being performed.
     """
 
 
@@ -254,6 +289,20 @@ def copy(text):
     """
 
 
+@_proxy
+def clipboard():
+    """
+    Return an object to be used as a context-manager that will keep the clipboard
+    open for as long as it's open, so that `paste` and `copy` don't need to open it
+    every time. Other programs can't use the clipboard in the meantime.
+
+    For example, you can use this to change the clipboard contents:
+
+    >>> with clipboard():
+    >>>     copy(paste().upper())
+    """
+
+
 # Screen-related functions
 
 
@@ -290,6 +339,23 @@ def color(*args):
     return _mod.color(x, y)
 
 
+def colors(points):
+    """
+    Returns a list with the `(r, g, b)` color at each of the given `(x, y)` positions.
+
+    This reads the screen only once, so it's much faster than calling `color` for every point:
+
+    >>> left, right = colors([(100, 200), (300, 200)])
+    """
+    points = list(points)
+    if not points:
+        return []
+
+    xs, ys = zip(*points)
+    left, top = min(xs), min(ys)
+    with screenshot(left, top, max(xs) - left + 1, max(ys) - top + 1) as ss:
+        return [ss[x - left, y - top] for x, y in points]
+
 
 def screenshot(*args):
     """
@@ -324,6 +390,12 @@ def screenshot(*args):
     >>> ss.refresh()  # like taking a new screenshot of the same region but faster
 
     You can convert the screenshot to raw bytes in RGB format with `bytes(ss)`.
+
+    The resources used by the screenshot are freed when it's garbage-collected, but you can
+    also use it as a context-manager to free them as soon as you're done with it:
+
+    >>> with screenshot() as ss:
+    ...     pixels = [ss[x, 200] for x in range(100, 200)]
     """
     argc = len(args)
     if argc == 0:
@@ -334,15 +406,9 @@ def screenshot(*args):
     else:
         raise TypeError('0 or 2 arguments required, but {} given'.format(argc))
 
-    if any(isinstance(v, float) for v in (x, y, w, h)):
+    values = (x, y, w, h)
+    if any(isinstance(v, float) for v in values):
         width, height = size()
-        if isinstance(x, float):
-            x *= width
-        if isinstance(y, float):
-            y *= height
-        if isinstance(w, float):
-            w *= width
-        if isinstance(h, float):
-            h *= height
-
-    return _mod.screenshot(*(map(int, (x, y, w, h))))
+        values = (v * s if isinstance(v, float) else v for v, s in zip(values, (width, height, width, height)))
+
+    return _mod.screenshot(*map(int, values))
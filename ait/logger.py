@@ -1,15 +1,24 @@
-import itertools
-
 try:
     import Xlib
     import Xlib.XK
     import Xlib.display
+    import Xlib.error
     import Xlib.ext
     import Xlib.ext.record
     import Xlib.protocol
 except ImportError:
     Xlib = None
 
+if Xlib is not None:
+    # Keys whose keysym changes while shift is held (or caps lock is on).
+    _SHIFTABLE = frozenset(vars(Xlib.XK)['XK_' + name] for name in (
+        *'abcdefghijklmnopqrstuvwxyz0123456789',
+        'minus', 'equal', 'bracketleft', 'bracketright', 'semicolon',
+        'backslash', 'apostrophe', 'comma', 'period', 'slash', 'grave',
+    ))
+
+    _SHIFT_KEYS = frozenset((Xlib.XK.XK_Shift_L, Xlib.XK.XK_Shift_R, Xlib.XK.XK_Shift_Lock))
+
 
 class Logger:
     def __init__(self):
@@ -23,6 +32,8 @@ class Logger:
 
         self._key_cb = None
         self._mouse_cb = None
+        self._key_batch_cb = None
+        self._mouse_batch_cb = None
 
         self._context = None
         self._field = Xlib.protocol.rq.EventField(None)
@@ -30,16 +41,18 @@ class Logger:
         self._mouse_pos = (0, 0)
         self._shift_held = False
         self._caps_held = False
-        self._shiftable = {getattr(Xlib.XK, f'XK_{name}')
-                           for name in itertools.chain(
-            'abcdefghijklmnopqrstuvwxyz0123456789',
-            ('minus', 'equal', 'bracketleft', 'bracketright', 'semicolon',
-             'backslash', 'apostrophe', 'comma', 'period', 'slash', 'grave')
-        )}
-
-        self._shift_keys = (
-            Xlib.XK.XK_Shift_L, Xlib.XK.XK_Shift_R, Xlib.XK.XK_Shift_Lock
-        )
+        self._shiftable = _SHIFTABLE
+        self._shift_keys = _SHIFT_KEYS
+
+        self._key_handlers = {
+            Xlib.X.KeyPress: self._create_key_press_event,
+            Xlib.X.KeyRelease: self._create_key_release_event,
+        }
+        self._mouse_handlers = {
+            Xlib.X.ButtonPress: self._create_button_press_event,
+            Xlib.X.ButtonRelease: self._create_button_release_event,
+            Xlib.X.MotionNotify: self._create_mouse_move_event,
+        }
 
     def keyboard(self, func):
         """
@@ -73,6 +86,40 @@ class Logger:
         self._mouse_cb = func
         return func
 
+    def keyboard_batch(self, func):
+        """
+        Decorator to be attached to the function that will receive
+        a list with all the keyboard events that arrived together:
+
+        >>> log = Logger(...)
+        >>>
+        >>> @log.keyboard_batch
+        ... def on_kbd(events):
+        ...     for event in events:
+        ...         pass  # Some code...
+        ...
+        """
+        self._key_batch_cb = func
+        return func
+
+    def mouse_batch(self, func):
+        """
+        Decorator to be attached to the function that will receive
+        a list with all the mouse events that arrived together.
+
+        Consecutive movements are merged into the latest one, so
+        this is useful when only the final position matters:
+
+        >>> log = Logger(...)
+        >>>
+        >>> @log.mouse_batch
+        ... def on_mouse(events):
+        ...     print(events[-1].pos)
+        ...
+        """
+        self._mouse_batch_cb = func
+        return func
+
     def run(self):
         """
         Creates a new record context to enable logging.
@@ -119,24 +166,41 @@ class Logger:
             return
 
         data = reply.data
+        key_cb = self._key_cb
+        mouse_cb = self._mouse_cb
+        key_events = [] if self._key_batch_cb else None
+        mouse_events = [] if self._mouse_batch_cb else None
         while data:
             event, data = self._field.parse_binary_value(
                 data, self.record_dpy.display, None, None
             )
 
-            if self._key_cb:
-                if event.type == Xlib.X.KeyPress:
-                    self._key_cb(self._create_key_press_event(event))
-                elif event.type == Xlib.X.KeyRelease:
-                    self._key_cb(self._create_key_release_event(event))
-
-            if self._mouse_cb:
-                if event.type == Xlib.X.ButtonPress:
-                    self._mouse_cb(self._create_button_press_event(event))
-                elif event.type == Xlib.X.ButtonRelease:
-                    self._mouse_cb(self._create_button_release_event(event))
-                elif event.type == Xlib.X.MotionNotify:
-                    self._mouse_cb(self._create_mouse_move_event(event))
+            if key_cb or key_events is not None:
+                handler = self._key_handlers.get(event.type)
+                if handler:
+                    key_event = handler(event)
+                    if key_cb:
+                        key_cb(key_event)
+                    if key_events is not None:
+                        key_events.append(key_event)
+
+            if mouse_cb or mouse_events is not None:
+                handler = self._mouse_handlers.get(event.type)
+                if handler:
+                    mouse_event = handler(event)
+                    if mouse_cb:
+                        mouse_cb(mouse_event)
+                    if mouse_events is not None:
+                        if mouse_event.move and mouse_events and mouse_events[-1].move:
+                            # Only the latest of several movements in a row is kept for the batch.
+                            mouse_events[-1] = mouse_event
+                        else:
+                            mouse_events.append(mouse_event)
+
+        if key_events:
+            self._key_batch_cb(key_events)
+        if mouse_events:
+            self._mouse_batch_cb(mouse_events)
 
     def _create_key_press_event(self, event):
         keysym = self.local_dpy.keycode_to_keysym(event.detail, 0)
@@ -191,7 +255,9 @@ class KeyEvent:
         getattr(Xlib.XK, name): name[3:]
         for name in dir(Xlib.XK)
         if name.startswith('XK_')
-    }
+    } if Xlib is not None else {}
+    # Keysyms below 256 are the same as their Latin-1 (and so ASCII) value.
+    _key_to_ascii = {key: key for key in _key_to_name if key < 256}
 
     def __init__(self, key, down, shift, caps):
         self.key = key
@@ -222,9 +288,7 @@ class KeyEvent:
 
     @classmethod
     def _keysym_to_ascii(cls, keysym):
-        value = Xlib.XK.string_to_keysym(cls._lookup_keysym(keysym))
-        print(keysym, value)
-        return value if value < 256 else 0
+        return cls._key_to_ascii.get(keysym, 0)
 
 
 class MouseEvent:
@@ -244,17 +308,20 @@ class MouseEvent:
         pos    : The position tuple as (x, y).
         move   : True if the mouse moved.
     """
-    def __init__(self, other, down, pos, move):
-        self.left = other == Xlib.X.Button1
-        self.right = other == Xlib.X.Button3
-        self.middle = other == Xlib.X.Button2
-        if other == Xlib.X.Button4:
-            self.wheel = 1
-        elif other == Xlib.X.Button5:
-            self.wheel = -1
-        else:
-            self.wheel = 0
+    __slots__ = ('left', 'right', 'middle', 'wheel', 'other', 'down', 'up', 'x', 'y', 'pos', 'move')
+
+    # (left, right, middle, wheel) for each button.
+    _button_info = {
+        Xlib.X.Button1: (True, False, False, 0),
+        Xlib.X.Button2: (False, False, True, 0),
+        Xlib.X.Button3: (False, True, False, 0),
+        Xlib.X.Button4: (False, False, False, 1),
+        Xlib.X.Button5: (False, False, False, -1),
+    } if Xlib is not None else {}
+    _no_button_info = (False, False, False, 0)
 
+    def __init__(self, other, down, pos, move):
+        self.left, self.right, self.middle, self.wheel = self._button_info.get(other, self._no_button_info)
         self.other = other
         self.down = down
         self.up = not down
@@ -0,0 +1,28 @@
+import unittest
+
+from ait._common import MB
+
+
+class TestMouseButton(unittest.TestCase):
+    def test_parse_button(self):
+        self.assertIs(MB.parse(MB.R), MB.R)
+
+    def test_parse_number(self):
+        self.assertIs(MB.parse(-3), MB.L)
+        self.assertIs(MB.parse(0.0), MB.M)
+        self.assertIs(MB.parse(1), MB.R)
+
+    def test_parse_name(self):
+        self.assertIs(MB.parse('l'), MB.L)
+        self.assertIs(MB.parse('MMB'), MB.M)
+        self.assertIs(MB.parse('rmb'), MB.R)
+
+    def test_parse_invalid(self):
+        for value in ('X', '', None, [1]):
+            with self.subTest(value=value):
+                with self.assertRaises(ValueError):
+                    MB.parse(value)
+
+
+if __name__ == '__main__':
+    unittest.main()
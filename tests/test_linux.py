@@ -0,0 +1,163 @@
+import importlib
+import subprocess
+import threading
+import unittest
+from unittest import mock
+
+from ait import _linux
+
+
+def setUpModule():
+    # Without xdotool the actions are replaced by functions that only raise, so pretend that it is installed.
+    with mock.patch('shutil.which', return_value='/usr/bin/xdotool'):
+        importlib.reload(_linux)
+
+
+def tearDownModule():
+    importlib.reload(_linux)
+
+
+class TestBatch(unittest.TestCase):
+    def setUp(self):
+        patcher = mock.patch.object(_linux, '_xdotool_run', return_value=b'x:12 y:34 screen:0 window:1\n')
+        self.run = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def assertRuns(self, *runs):
+        self.assertEqual([c[0][0] for c in self.run.call_args_list], list(runs))
+
+    def test_no_batch(self):
+        _linux.move(1, 2)
+        _linux.click()
+        self.assertRuns(('mousemove', '1', '2'), ('click', '1'))
+
+    def test_chained(self):
+        with _linux.batch():
+            _linux.move(1, 2)
+            _linux.click('r')
+            self.assertRuns()
+
+        self.assertRuns(('mousemove', '1', '2', 'click', '3'))
+
+    def test_consecutive_moves(self):
+        with _linux.batch():
+            _linux.move(1, 2)
+            _linux.move(3, 4)
+            _linux.click()
+            _linux.move(5, 6)
+            _linux.move(7, 8)
+
+        self.assertRuns(('mousemove', '3', '4', 'click', '1', 'mousemove', '7', '8'))
+
+    def test_relative_moves_and_paths(self):
+        with _linux.batch():
+            _linux.move(1, 2)
+            _linux.move(3j, 0)
+            _linux.move_path([(1, 1), (2, 2)])
+            _linux.move(9, 9)
+
+        self.assertRuns(('mousemove', '1', '2', 'mousemove_relative', '3', '0',
+                         'mousemove', '1', '1', 'mousemove', '2', '2', 'mousemove', '9', '9'))
+
+    def test_nothing_chained_after_key_or_type(self):
+        with _linux.batch():
+            _linux.press('a', 'ctrl+c')
+            _linux.move(1, 2)
+            _linux.write('hi')
+            _linux.click()
+
+        self.assertRuns(('key', 'a', 'ctrl+c'), ('mousemove', '1', '2', 'type', 'hi'), ('click', '1'))
+
+    def test_discarded_on_error(self):
+        with self.assertRaises(ZeroDivisionError):
+            with _linux.batch():
+                _linux.move(1, 2)
+                1 / 0
+
+        self.assertRuns()
+        _linux.move(3, 4)
+        self.assertRuns(('mousemove', '3', '4'))
+
+    def test_nested(self):
+        with _linux.batch():
+            with _linux.batch():
+                _linux.move(1, 2)
+            self.assertRuns()
+            _linux.click()
+
+        self.assertRuns(('mousemove', '1', '2', 'click', '1'))
+
+    def test_per_thread(self):
+        with _linux.batch():
+            _linux.move(1, 2)
+            thread = threading.Thread(target=_linux.click)
+            thread.start()
+            thread.join()
+            self.assertRuns(('click', '1'))
+
+        self.assertRuns(('click', '1'), ('mousemove', '1', '2'))
+
+    def test_mouse_runs_pending(self):
+        with _linux.batch():
+            _linux.move(1, 2)
+            self.assertEqual(_linux.mouse(), (12, 34))
+            self.assertRuns(('mousemove', '1', '2'), ('getmouselocation',))
+
+        self.assertEqual(self.run.call_count, 2)
+
+
+class TestParsePos(unittest.TestCase):
+    def setUp(self):
+        _linux._parse_scaled_pos.cache_clear()
+        patcher = mock.patch.object(_linux, '_get_screen_size', return_value=(1000, 500))
+        self.screen_size = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_pixels(self):
+        self.assertEqual(_linux._parse_pos(10, 20), ('10', '20', False))
+        self.assertEqual(_linux._parse_pos(10.0, 20.5), ('10', '20', False))
+        self.screen_size.assert_not_called()
+
+    def test_fractions(self):
+        self.assertEqual(_linux._parse_pos(0.5, 0.5), ('500', '250', False))
+        self.assertEqual(_linux._parse_pos(0.25, 100), ('250', '100', False))
+
+    def test_relative(self):
+        x, y, rel = _linux._parse_pos(5j, -3j)
+        self.assertEqual((x, y), ('5', '-3'))
+        self.assertTrue(rel)
+
+        x, y, rel = _linux._parse_pos(0, 4j)
+        self.assertEqual((x, y), ('0', '4'))
+        self.assertTrue(rel)
+
+
+class TestXdotoolRun(unittest.TestCase):
+    def setUp(self):
+        patcher = mock.patch('subprocess.run')
+        self.run = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_action(self):
+        _linux.click()
+        self.run.assert_called_once_with((_linux._XDOTOOL, 'click', '1'), stdout=subprocess.DEVNULL,
+                                         timeout=None, check=True, close_fds=False)
+
+    def test_query(self):
+        self.run.return_value.stdout = b'x:12 y:34 screen:0 window:1\n'
+        self.assertEqual(_linux.mouse(), (12, 34))
+        self.assertEqual(self.run.call_args[1]['timeout'], _linux.XDOTOOL_QUERY_TIMEOUT)
+
+    def test_timeout(self):
+        self.run.side_effect = subprocess.TimeoutExpired('xdotool', _linux.XDOTOOL_QUERY_TIMEOUT)
+        with self.assertRaisesRegex(RuntimeError, 'did not answer'):
+            _linux.mouse()
+
+    def test_failure(self):
+        self.run.side_effect = subprocess.CalledProcessError(3, 'xdotool')
+        with self.assertRaisesRegex(RuntimeError, 'exit status 3'):
+            _linux.press('a')
+
+
+if __name__ == '__main__':
+    unittest.main()
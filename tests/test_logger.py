@@ -0,0 +1,64 @@
+import os
+import types
+import unittest
+from unittest import mock
+
+import ait
+from ait import logger
+
+
+@unittest.skipIf(logger.Xlib is None, 'python-xlib is not installed')
+class TestMouseBatch(unittest.TestCase):
+    def setUp(self):
+        display = mock.Mock(extensions=['RECORD'])
+        with mock.patch('Xlib.display.Display', return_value=display):
+            self.log = logger.Logger()
+
+    def process(self, *events):
+        # Each byte of data stands for one event, which is all the (stubbed) event parsing needs.
+        events = iter(events)
+        self.log._field = mock.Mock()
+        self.log._field.parse_binary_value.side_effect = lambda data, *args: (next(events), data[1:])
+        self.log._process_events(types.SimpleNamespace(
+            category=logger.Xlib.ext.record.FromServer,
+            client_swapped=False,
+            data=bytes([2]) * 5,
+        ))
+
+    def test_consecutive_moves(self):
+        X = logger.Xlib.X
+        single = []
+        batches = []
+        self.log.mouse(single.append)
+        self.log.mouse_batch(batches.append)
+
+        def move(x, y):
+            return types.SimpleNamespace(type=X.MotionNotify, root_x=x, root_y=y)
+
+        self.process(move(1, 1), move(2, 2), types.SimpleNamespace(type=X.ButtonPress, detail=1),
+                     move(3, 3), move(4, 4))
+
+        self.assertEqual(len(single), 5)
+        self.assertEqual(len(batches), 1)
+        self.assertEqual([(event.pos, event.move, event.down) for event in batches[0]],
+                         [((2, 2), True, None), ((2, 2), False, True), ((4, 4), True, None)])
+
+
+@unittest.skipIf(os.name == 'nt', 'only the Linux backend has a logger')
+class TestLog(unittest.TestCase):
+    def test_unavailable(self):
+        with mock.patch('ait.logger.Logger', side_effect=ValueError) as logger_class:
+            with mock.patch.dict(ait.ait._mod.__dict__):
+                ait.ait._mod.__dict__.pop('log', None)
+                self.assertIsNone(ait.log)
+                self.assertIsNone(ait.log)
+
+        logger_class.assert_called_once_with()
+
+    def test_unknown_attribute(self):
+        with self.assertRaises(AttributeError):
+            ait.does_not_exist
+
+
+if __name__ == '__main__':
+    unittest.main()
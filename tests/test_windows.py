@@ -0,0 +1,233 @@
+import ctypes
+import importlib.util
+import os
+import threading
+import unittest
+from unittest import mock
+
+import ait
+
+w = None
+
+
+class _FakeDLL:
+    # Every function returns 1, which is enough for the module to set itself up at import time.
+    def __init__(self, name, *args, **kwargs):
+        self.name = name
+
+    def __getattr__(self, name):
+        fn = mock.Mock(name=name, return_value=1)
+        setattr(self, name, fn)
+        return fn
+
+
+def setUpModule():
+    # The Windows backend is loaded on its own (and with no real Win32 behind it), so it can be tested anywhere.
+    global w
+    path = os.path.join(os.path.dirname(ait.__file__), '_windows.py')
+    spec = importlib.util.spec_from_file_location('ait._windows_stubbed', path)
+    w = importlib.util.module_from_spec(spec)
+
+    cdll = ctypes.CDLL
+    with mock.patch.object(ctypes, 'WinDLL', _FakeDLL, create=True), \
+            mock.patch.object(ctypes, 'WINFUNCTYPE', ctypes.CFUNCTYPE, create=True), \
+            mock.patch.object(ctypes, 'CDLL', lambda name, *a, **k: _FakeDLL(name) if name == 'msvcrt'
+                              else cdll(name, *a, **k)):
+        spec.loader.exec_module(w)
+
+
+def _clear_caches():
+    for fn in (w._lookup_vk, w._vk_to_kbd_input, w._key_inputs, w._hold_inputs):
+        fn.cache_clear()
+
+
+class TestKeys(unittest.TestCase):
+    def setUp(self):
+        _clear_caches()
+        self.addCleanup(_clear_caches)
+        patcher = mock.patch.object(w, 'SendInput')
+        self.send_input = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def sent(self):
+        count, inputs, _ = self.send_input.call_args[0]
+        return [(i.value.ki.wVk, not i.value.ki.dwFlags & w.KEYEVENTF_KEYUP) for i in inputs[:count]]
+
+    def test_names_and_characters(self):
+        self.assertEqual(w._key_to_vk('a'), 0x41)
+        self.assertEqual(w._key_to_vk(' ctrl '), w.KEY_MAP['CTRL'])
+        self.assertEqual(w._key_to_vk(' '), w.KEY_MAP['SPACE'])
+        self.assertEqual(w._key_to_vk('\xd7'), 0xd7)
+
+    def test_unknown_key(self):
+        for key in ('NOPE', '\u20ac', ''):
+            with self.subTest(key=key):
+                with self.assertRaisesRegex(ValueError, 'Unknown key'):
+                    w.press(key)
+        self.send_input.assert_not_called()
+
+    def test_chord(self):
+        w.press('ctrl+a')
+        ctrl = w.KEY_MAP['CTRL']
+        self.assertEqual(self.sent(), [(ctrl, True), (0x41, True), (0x41, False), (ctrl, False)])
+
+    def test_several_keys(self):
+        w.press('a', 'b')
+        self.assertEqual(self.sent(), [(0x41, True), (0x41, False), (0x42, True), (0x42, False)])
+
+
+class TestKeyboardInput(unittest.TestCase):
+    def setUp(self):
+        _clear_caches()
+        self.addCleanup(_clear_caches)
+
+    def test_unknown_virtual_key(self):
+        for vk in (-1, 0x100):
+            with self.subTest(vk=vk):
+                with self.assertRaisesRegex(ValueError, 'Unknown virtual key'):
+                    w._vk_to_kbd_input(vk, True)
+
+    def test_scan_codes(self):
+        scans = [0] * 256
+        scans[0x41] = 0x1e
+        scans[0xa3] = 0xe01d
+        with mock.patch.object(w, '_VK_TO_SCAN', tuple(scans)):
+            a = w._vk_to_kbd_input(0x41, True).value.ki
+            rctrl = w._vk_to_kbd_input(0xa3, False).value.ki
+
+        self.assertEqual((a.wVk, a.wScan, a.dwFlags), (0x41, 0x1e, 0))
+        self.assertEqual((rctrl.wVk, rctrl.wScan, rctrl.dwFlags),
+                         (0xa3, 0x1d, w.KEYEVENTF_KEYUP | w.KEYEVENTF_EXTENDEDKEY))
+
+
+class TestParsePos(unittest.TestCase):
+    def setUp(self):
+        for name, value in (('size', (1000, 500)), ('mouse', (100, 100))):
+            patcher = mock.patch.object(w, name, return_value=value)
+            setattr(self, name, patcher.start())
+            self.addCleanup(patcher.stop)
+
+    def test_pixels(self):
+        self.assertEqual(w._parse_pos(500, 250), (32767, 32767))
+        self.assertEqual(w._parse_pos(0, 500), (0, 65535))
+        self.mouse.assert_not_called()
+
+    def test_fractions(self):
+        self.assertEqual(w._parse_pos(0.5, 0.5), (32767, 32767))
+        self.assertEqual(w._parse_pos(0.5, 250), (32767, 32767))
+
+    def test_relative(self):
+        self.assertEqual(w._parse_pos(10j, -20j), (110 * 65535 // 1000, 80 * 65535 // 500))
+
+
+class TestHooks(unittest.TestCase):
+    def setUp(self):
+        self.quit = threading.Event()
+        self.held = set()
+
+        def get_message(*args):
+            self.quit.wait()
+            self.quit.clear()
+            return 0
+
+        stubs = {
+            '_listeners': frozenset(),
+            '_hook_thread': None,
+            '_hook_thread_id': None,
+            '_hook_down': bytearray(256),
+            'GetMessageW': get_message,
+            'PeekMessageW': lambda *args: 1,
+            'PostThreadMessageW': lambda *args: self.quit.set() or 1,
+            'GetCurrentThreadId': lambda: 42,
+            'GetModuleHandleW': lambda name: 1,
+            'SetWindowsHookExW': mock.Mock(return_value=1),
+            'UnhookWindowsHookEx': mock.Mock(return_value=1),
+            'CallNextHookEx': lambda *args: 0,
+            'GetAsyncKeyState': lambda vk: -0x8000 if vk in self.held else 0,
+        }
+        for name, value in stubs.items():
+            patcher = mock.patch.object(w, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        # Runs before the patches are undone, so the hook thread is stopped with the stubs it started with.
+        self.addCleanup(self.stop_hooks)
+
+    def stop_hooks(self):
+        self.quit.set()
+        if w._hook_thread is not None:
+            w._hook_thread.join(1)
+
+    def listen(self):
+        listener = w._Listener()
+        w._listen(listener)
+        self.addCleanup(w._unlisten, listener)
+        return listener
+
+    def received(self, listener):
+        events = []
+        while not listener.queue.empty():
+            events.append(listener.queue.get_nowait())
+        return events
+
+    def test_repeats_and_generic_modifiers(self):
+        listener = self.listen()
+        w._hook_emit(0x41, True)
+        w._hook_emit(0x41, True)
+        w._hook_emit(0xa0, True)
+        w._hook_emit(0xa1, True)
+        w._hook_emit(0xa0, False)
+        w._hook_emit(0xa1, False)
+        w._hook_emit(0x41, False)
+        self.assertEqual(self.received(listener), [
+            ('A', True),
+            ('LSHIFT', True), ('SHIFT', True), ('RSHIFT', True),
+            ('LSHIFT', False), ('RSHIFT', False), ('SHIFT', False),
+            ('A', False),
+        ])
+
+    def test_keyboard_hook(self):
+        listener = self.listen()
+        info = w.KBDLLHOOKSTRUCT(vkCode=0x41)
+        w._keyboard_hook(w.HC_ACTION, w.WM_SYSKEYDOWN, ctypes.addressof(info))
+        w._keyboard_hook(w.HC_ACTION, w.WM_KEYUP, ctypes.addressof(info))
+        self.assertEqual(self.received(listener), [('A', True), ('A', False)])
+
+    def test_held_keys(self):
+        self.held.update((0x41, 0xa0, 0x10))
+        listener = self.listen()
+        w._hook_emit(0x41, True)
+        w._hook_emit(0x41, False)
+        w._hook_emit(0xa0, False)
+        self.assertEqual(self.received(listener), [('A', False), ('LSHIFT', False), ('SHIFT', False)])
+
+    def test_start_failure(self):
+        w.SetWindowsHookExW.return_value = 0
+        with mock.patch.object(ctypes, 'WinError', lambda: OSError('no hooks'), create=True):
+            with self.assertRaisesRegex(OSError, 'no hooks'):
+                w._listen(w._Listener())
+
+        self.assertEqual(w._listeners, frozenset())
+        self.assertIsNone(w._hook_thread_id)
+        w.UnhookWindowsHookEx.assert_not_called()
+
+    def test_start_timeout(self):
+        slow = threading.Event()
+        with mock.patch.object(w, 'HOOKS_TIMEOUT', 0.1), \
+                mock.patch.object(w, 'PeekMessageW', lambda *args: slow.wait() and 1):
+            with self.assertRaisesRegex(RuntimeError, 'did not start'):
+                w._listen(w._Listener())
+
+            stuck = w._hook_thread
+            self.assertTrue(stuck.is_alive())
+            self.assertIsNone(w._hook_thread_id)
+
+            slow.set()
+            self.listen()
+            self.assertFalse(stuck.is_alive())
+            self.assertIsNot(w._hook_thread, stuck)
+            self.assertEqual(w._hook_thread_id, 42)
+
+
+if __name__ == '__main__':
+    unittest.main()